@@ -1,21 +1,47 @@
-from flask import Flask, render_template, request, redirect, url_for, send_file, Response, jsonify, session
+from flask import Flask, Request, render_template, request, redirect, url_for, send_file, Response, jsonify, session
 import firebase_admin
 from firebase_admin import credentials, firestore
 from datetime import datetime
-import json
+import functools
 import re
 import io
 import csv
-from typing import List, Dict
+from typing import List, Dict, Optional
+from concurrent.futures import ThreadPoolExecutor
+import threading
 import os
 import glob
+import shutil
+import tempfile
+from urllib.parse import quote
+from flask.json.provider import DefaultJSONProvider
 from werkzeug.utils import secure_filename
 import openpyxl
+import orjson
+from cachetools import TTLCache, cached
+
+
+class ORJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider that serializes with orjson.
+
+    Types orjson does not handle natively (and dates, so they keep Flask's HTTP date
+    format) fall back to DefaultJSONProvider.default.
+    """
+
+    def dumps(self, obj, **kwargs) -> str:
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if kwargs.get('sort_keys', self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        if kwargs.get('indent'):
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=kwargs.get('default', self.default), option=option).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
 
-# Reference to openpyxl to keep static analyzers quiet (used when exporting xlsx via pandas/openpyxl)
-_ = getattr(openpyxl, '__version__', None)
 
 app = Flask(__name__)
+app.json = ORJSONProvider(app)
 app.secret_key = os.environ.get('SECRET_KEY', 'dev-secret-key')
 
 # -------------------- Auth (CSV) --------------------
@@ -87,15 +113,16 @@ def authenticate(username: str, password: str) -> dict:
 # Base link to use when constructing absolute URLs for saved DB links.
 # Change this to your deployment base URL when you deploy (e.g. https://example.com)
 curr_link = os.environ.get('CURR_LINK', "https://tantra-backend-3bmp.onrender.com")
+# Absolute prefix for files under the static folder (Flask serves it at /static)
+_STATIC_PREFIX = curr_link.rstrip('/') + app.static_url_path + '/'
 
 def make_static_url(filename: str) -> str:
     """Return an absolute URL for a file in the static folder using curr_link as base.
 
     Example: make_static_url('logos/foo.png') -> 'http://127.0.0.1:5000/static/logos/foo.png'
     """
-    # use url_for to get the path portion, then prefix with curr_link
-    path = url_for('static', filename=filename, _external=False)
-    return curr_link.rstrip('/') + path
+    # plain concatenation; no request context or URL map lookup needed
+    return _STATIC_PREFIX + quote(filename)
 
 
 def _get_branch(obj: dict) -> str:
@@ -110,6 +137,43 @@ def _get_branch(obj: dict) -> str:
     return (obj.get('branch/Class') or obj.get('branch') or obj.get('Class') or obj.get('branch_name') or '')
 
 
+def _collection_count(query) -> int:
+    """Return the number of documents matched by a collection/query.
+
+    Uses a server-side aggregation so Firestore returns a single number instead
+    of streaming every document just to call len() on it.
+    """
+    result = query.count().get()
+    return int(result[0][0].value)
+
+
+# Participant fields read by the participant listing/export views. 'branch/Class' is
+# back-quoted because '/' is not allowed in a bare Firestore field path.
+PARTICIPANT_FIELDS = ['name', 'email', 'phone', 'college', '`branch/Class`', 'branch', 'Class', 'branch_name',
+                      'year', 'event', 'department', 'transactionId', 'transaction_id', 'txid', 'transaction']
+
+
+class _SanitizeTable(dict):
+    """str.translate table that maps any character without an explicit entry to '_'."""
+
+    def __missing__(self, key):
+        return '_'
+
+
+# a-z and 0-9 map to themselves; every other ASCII character becomes '_'
+_SANITIZE_TABLE = _SanitizeTable({i: (chr(i) if chr(i) in 'abcdefghijklmnopqrstuvwxyz0123456789' else '_') for i in range(128)})
+_MULTI_UNDERSCORE = re.compile(r'_+')
+
+
+def _sanitize(s: str) -> str:
+    """Make a value safe for use in a filename: lowercase, runs of non [a-z0-9] become one '_'."""
+    if not s:
+        return ''
+    s = _MULTI_UNDERSCORE.sub('_', s.lower().translate(_SANITIZE_TABLE))
+    s = s.strip('_')
+    return s or 'value'
+
+
 def _normalize_status(val) -> str:
     """Normalize a status value from the database or incoming form to a string 'open' or 'close'.
 
@@ -143,6 +207,29 @@ app.config['UPLOAD_QR_FOLDER'] = UPLOAD_QR_FOLDER
 app.config['UPLOAD_EVENT_FOLDER'] = UPLOAD_EVENT_FOLDER
 app.config['UPLOAD_LOGO_FOLDER'] = UPLOAD_LOGO_FOLDER
 
+# Chunk size used when copying uploaded files to disk
+UPLOAD_CHUNK_SIZE = 1 << 16
+
+
+class _DiskSpoolRequest(Request):
+    """Request that spools every uploaded file to a temporary file on disk.
+
+    Werkzeug keeps small uploads in memory by default; using a plain TemporaryFile
+    means an upload never has to be held in RAM in full.
+    """
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return tempfile.TemporaryFile('wb+')
+
+
+app.request_class = _DiskSpoolRequest
+
+
+def _stream_save(fileobj, path: str) -> None:
+    """Copy an uploaded FileStorage to path in fixed-size chunks."""
+    with open(path, 'wb', buffering=0) as out:
+        shutil.copyfileobj(fileobj.stream, out, length=UPLOAD_CHUNK_SIZE)
+
 # -------------------- Firebase --------------------
 # Initialize Firebase using one of the following (in order of preference):
 # 1) FIREBASE_SERVICE_ACCOUNT_JSON environment variable containing the
@@ -153,27 +240,120 @@ app.config['UPLOAD_LOGO_FOLDER'] = UPLOAD_LOGO_FOLDER
 _sa_json = os.environ.get('FIREBASE_SERVICE_ACCOUNT_JSON')
 _sa_file = os.environ.get('FIREBASE_CREDENTIALS_FILE', 'techfestadmin-a2e2c-firebase-adminsdk-fbsvc-a2a3aaa0e7.json')
 
-if _sa_json:
-    try:
-        sa_info = json.loads(_sa_json) if isinstance(_sa_json, str) else _sa_json
-        cred = credentials.Certificate(sa_info)
-    except Exception as e:
-        raise RuntimeError('Failed to parse FIREBASE_SERVICE_ACCOUNT_JSON: ' + str(e))
-elif os.path.exists(_sa_file):
-    cred = credentials.Certificate(_sa_file)
-else:
+_firebase_lock = threading.Lock()
+
+
+def _certificate_from_file(path: str):
+    """Load a service account file with orjson (Certificate(path) would parse it with stdlib json)."""
+    with open(path, 'rb') as f:
+        return credentials.Certificate(orjson.loads(f.read()))
+
+
+def _load_firebase_credentials():
+    """Build the service account credential from the sources listed above."""
+    if _sa_json:
+        try:
+            sa_info = orjson.loads(_sa_json) if isinstance(_sa_json, (str, bytes)) else _sa_json
+            return credentials.Certificate(sa_info)
+        except Exception as e:
+            raise RuntimeError('Failed to parse FIREBASE_SERVICE_ACCOUNT_JSON: ' + str(e))
+    if os.path.exists(_sa_file):
+        return _certificate_from_file(_sa_file)
     # Try to auto-detect a service account file matching the typical filename pattern.
     candidates = glob.glob(os.path.join(os.getcwd(), 'techfestadmin*.json'))
     if candidates:
         # pick the first candidate and proceed
         picked = candidates[0]
         print(f"Using detected Firebase service account file: {picked}")
-        cred = credentials.Certificate(picked)
-    else:
-        raise RuntimeError('Firebase service account not found. Set FIREBASE_SERVICE_ACCOUNT_JSON or FIREBASE_CREDENTIALS_FILE.')
+        return _certificate_from_file(picked)
+    raise RuntimeError('Firebase service account not found. Set FIREBASE_SERVICE_ACCOUNT_JSON or FIREBASE_CREDENTIALS_FILE.')
+
+
+@functools.lru_cache(maxsize=1)
+def _init_firebase():
+    """Initialize the default Firebase app (once per process) and return the Firestore client.
+
+    Deferred until the first database access so importing the module (worker start,
+    static file requests) does not pay for credential parsing and client setup.
+    """
+    with _firebase_lock:
+        try:
+            firebase_admin.get_app()
+        except ValueError:
+            firebase_admin.initialize_app(_load_firebase_credentials())
+    return firestore.client()
+
+
+class _LazyClient:
+    """Stand-in for the Firestore client that initializes Firebase on first use."""
+
+    def __init__(self, factory):
+        self._factory = factory
+
+    def __getattr__(self, name):
+        return getattr(self._factory(), name)
+
+
+db = _LazyClient(_init_firebase)
+
+# -------------------- Metadata cache --------------------
+# Departments and per-department events change rarely but are read on almost every
+# page, so keep a short-lived in-process copy. Writers clear these caches (see
+# _invalidate_events) so edits made through this app show up immediately.
+METADATA_CACHE_TTL = 60
+
+
+@cached(TTLCache(maxsize=1, ttl=METADATA_CACHE_TTL), lock=threading.RLock())
+def _cached_depts() -> List[tuple]:
+    """Return all departments as a list of (doc_id, data) tuples."""
+    q = db.collection('departments').select(['name', 'description', 'logo_url', 'qr_url'])
+    return [(d.id, d.to_dict() or {}) for d in q.stream()]
+
+
+@cached(TTLCache(maxsize=256, ttl=METADATA_CACHE_TTL), lock=threading.RLock())
+def _cached_events_by_dept(dept_id: str) -> List[tuple]:
+    """Return events whose 'department' field equals dept_id as (doc_id, data) tuples."""
+    q = (db.collection('events')
+         .where('department', '==', dept_id)
+         .select(['name', 'date', 'status', 'image_url', 'venue', 'department', 'dept_id']))
+    return [(e.id, e.to_dict() or {}) for e in q.stream()]
 
-firebase_admin.initialize_app(cred)
-db = firestore.client()
+
+def _get_dept(dept_id: str) -> Optional[Dict]:
+    """Return a department's data from the cached department list, or None if it does not exist."""
+    for did, data in _cached_depts():
+        if did == dept_id:
+            return data
+    return None
+
+
+# Single events are cached for a shorter time. Lookups for ids that do not exist are
+# cached too (as _MISSING) so repeated 404s don't each cost a Firestore read.
+EVENT_CACHE_TTL = 30
+_event_cache = TTLCache(maxsize=2048, ttl=EVENT_CACHE_TTL)
+_event_cache_lock = threading.Lock()
+_MISSING = object()
+
+
+def _get_event_data(event_id: str) -> Optional[Dict]:
+    """Return an event document's data, or None if there is no event with that id."""
+    key = ('event', event_id)
+    with _event_cache_lock:
+        hit = _event_cache.get(key)
+    if hit is None:
+        snap = db.collection('events').document(event_id).get()
+        hit = (snap.to_dict() or {}) if snap.exists else _MISSING
+        with _event_cache_lock:
+            _event_cache[key] = hit
+    return None if hit is _MISSING else hit
+
+
+def _invalidate_events(*event_ids) -> None:
+    """Drop cached event data after this app writes to the given events."""
+    _cached_events_by_dept.cache_clear()
+    with _event_cache_lock:
+        for event_id in event_ids:
+            _event_cache.pop(('event', str(event_id)), None)
 
 # -------------------- Login / Home --------------------
 
@@ -301,9 +481,9 @@ def department_dashboard():
     # Resolve department name from Firestore. Try collections 'departments' then 'department'.
     dept_name = None
     try:
-        doc = db.collection('departments').document(department_id).get()
-        if doc.exists:
-            dept_name = doc.to_dict().get('name')
+        dept = _get_dept(department_id)
+        if dept is not None:
+            dept_name = dept.get('name')
         else:
             # try alternative collection name
             doc2 = db.collection('department').document(department_id).get()
@@ -320,7 +500,7 @@ def department_dashboard():
     # Gather participants where participant.department == dept_name
     participants = []
     try:
-        parts_q = db.collection('participants').where('department', '==', dept_name).stream()
+        parts_q = db.collection('participants').where('department', '==', dept_name).select(PARTICIPANT_FIELDS).stream()
         for pdoc in parts_q:
             p = pdoc.to_dict()
             participants.append({
@@ -358,7 +538,7 @@ def department_dashboard():
     # Build event list from events collection where department/ dept_id matches department_id
     events_info = []
     try:
-        all_events = list(db.collection('events').stream())
+        all_events = list(db.collection('events').select(['name', 'department', 'dept_id', 'status']).stream())
         for edoc in all_events:
             ev = edoc.to_dict()
             ev_dept = ev.get('department') or ev.get('dept_id') or ''
@@ -386,51 +566,89 @@ def department_dashboard():
 
 
 # -------------------- Home --------------------
+def _recent_events(limit: int) -> list:
+    """Return up to limit event snapshots for the dashboard, newest first.
+
+    Ordering by created_at skips events that lack the field (legacy/imported events),
+    so when that yields fewer than limit events the rest are filled from an unordered read.
+    """
+    fields = ['name', 'department', 'date', 'status']
+    events = list(db.collection('events')
+                  .order_by('created_at', direction=firestore.Query.DESCENDING)
+                  .limit(limit)
+                  .select(fields)
+                  .stream())
+    if len(events) < limit:
+        seen = {e.id for e in events}
+        # over-fetch by the number already seen so duplicates can't leave the list short
+        for e in db.collection('events').limit(limit + len(seen)).select(fields).stream():
+            if len(events) >= limit:
+                break
+            if e.id not in seen:
+                events.append(e)
+    return events
+
+
 @app.route('/index')
 def index():
+    # The dashboard reads are independent of each other, so issue them concurrently
+    # instead of paying one Firestore round-trip after another.
+    with ThreadPoolExecutor(max_workers=5) as ex:
+        depts_f = ex.submit(_cached_depts)
+        events_count_f = ex.submit(_collection_count, db.collection('events'))
+        events_f = ex.submit(_recent_events, 10)
+        # one projected pass over participants feeds both the per-event and the unique counts
+        parts_f = ex.submit(lambda: list(db.collection('participants').select(['event', 'email', 'phone']).stream()))
+        parts_count_f = ex.submit(_collection_count, db.collection('participants'))
+
     # Dashboard summary counts
     # Count departments
-    depts = list(db.collection('departments').stream())
+    depts = depts_f.result()
+    # department bodies are needed for the list below anyway, so len() is free here
     total_departments = len(depts)
-    # build department name map to avoid repeated lookups
-    dept_map = {d.id: d.to_dict().get('name', '') for d in depts}
+    # build department name map to avoid repeated lookups, and a simple departments
+    # list for the dashboard (id, name, logo_url), in the same pass
+    dept_map = {}
+    dept_list = []
+    for did, d in depts:
+        dept_map[did] = d.get('name', '')
+        dept_list.append((did, d.get('name', ''), d.get('logo_url', '')))
+
+    # Count events server-side; only the most recent ones are loaded for the list below
+    total_events = events_count_f.result()
+    events = events_f.result()
 
-    # Count events
-    events = list(db.collection('events').stream())
-    total_events = len(events)
+    # Count registrations/participants and unique participants
+    # Some deployments use a 'registrations' collection; others (your setup) use 'participants'.
+    total_registrations = parts_count_f.result()
 
-    # Build participant counts per event name (participants store event by name)
+    # Build participant counts per event name (participants store event by name) and the
+    # unique participant set in a single pass
     event_counts_map = {}
+    unique_participants = set()
     try:
-        parts_all = list(db.collection('participants').stream())
-        for pdoc in parts_all:
-            p = pdoc.to_dict()
-            ev = (p.get('event') or '').strip()
-            if ev:
-                event_counts_map[ev] = event_counts_map.get(ev, 0) + 1
+        parts = parts_f.result()
     except Exception:
-        event_counts_map = {}
-
-    # Count registrations/participants and unique participants
-    # Some deployments use a 'registrations' collection; others (your setup) use 'participants'.
-    parts = list(db.collection('participants').stream())
-    total_registrations = len(parts)
-    unique_participants = set()
+        parts = []
     for pdoc in parts:
         p = pdoc.to_dict()
+        ev = (p.get('event') or '').strip()
+        if ev:
+            event_counts_map[ev] = event_counts_map.get(ev, 0) + 1
         # prefer email as unique id, fallback to phone or doc id
         ident = (p.get('email') or p.get('phone') or pdoc.id)
         if ident:
             unique_participants.add(str(ident).strip().lower())
     total_unique_participants = len(unique_participants)
 
+    event_dicts = [(e.id, e.to_dict()) for e in events]
+
     # Build a small recent events list for the dashboard
     recent_events = []
-    for e in events:
-        ed = e.to_dict()
+    for eid, ed in event_dicts:
         did = ed.get('department')
         recent_events.append({
-            'id': e.id,
+            'id': eid,
             'name': ed.get('name'),
             'dept_id': did,
             # show the department name when known, otherwise show the raw dept id
@@ -441,9 +659,6 @@ def index():
             'participant_count': event_counts_map.get(ed.get('name') or '', 0)
         })
 
-    # prepare a simple departments list for the dashboard (id, name, logo_url)
-    dept_list = [(d.id, d.to_dict().get('name', ''), d.to_dict().get('logo_url', '')) for d in depts]
-
     return render_template('index.html',
                            total_departments=total_departments,
                            total_events=total_events,
@@ -463,15 +678,14 @@ def dept_events(dept_id):
     if not dept_id:
         return jsonify({'events': []})
     try:
-        ev_q = db.collection('events').where('department', '==', dept_id).stream()
+        ev_q = _cached_events_by_dept(dept_id)
     except Exception:
         # Fallback: return empty
         return jsonify({'events': []})
     evs = []
-    for e in ev_q:
-        ed = e.to_dict()
+    for eid, ed in ev_q:
         evs.append({
-            'id': e.id,
+            'id': eid,
             'name': ed.get('name'),
             'date': ed.get('date'),
             'status': _normalize_status(ed.get('status')),
@@ -487,12 +701,11 @@ def get_event(event_id):
     """Return a single event's details as JSON."""
     if not event_id:
         return jsonify({'error': 'missing id'}), 400
-    ev_doc = db.collection('events').document(event_id).get()
-    if not ev_doc.exists:
+    ed = _get_event_data(event_id)
+    if ed is None:
         return jsonify({'error': 'not found'}), 404
-    ed = ev_doc.to_dict()
     result = {
-        'id': ev_doc.id,
+        'id': event_id,
         'name': ed.get('name'),
         'description': ed.get('description', ''),
         'date': ed.get('date', ''),
@@ -519,7 +732,7 @@ def add_department():
         if logo_file and logo_file.filename != "":
             filename = secure_filename(logo_file.filename)
             path = os.path.join(app.config['UPLOAD_LOGO_FOLDER'], filename)
-            logo_file.save(path)
+            _stream_save(logo_file, path)
             logo_url = make_static_url(f'logos/{filename}')
 
         # Upload QR
@@ -528,7 +741,7 @@ def add_department():
         if qr_file and qr_file.filename != "":
             filename = secure_filename(qr_file.filename)
             path = os.path.join(app.config['UPLOAD_QR_FOLDER'], filename)
-            qr_file.save(path)
+            _stream_save(qr_file, path)
             qr_url = make_static_url(f'qr/{filename}')
 
         db.collection('departments').document().set({
@@ -538,17 +751,62 @@ def add_department():
             'qr_url': qr_url,
             'created_at': datetime.utcnow()
         })
+        _cached_depts.cache_clear()
         return redirect(url_for('index'))
     # show existing departments on the page for quick reference
-    departments = list(db.collection('departments').stream())
-    dept_list = [(d.id, d.to_dict().get('name', ''), d.to_dict().get('description', '')) for d in departments]
+    dept_list = [(did, d.get('name', ''), d.get('description', '')) for did, d in _cached_depts()]
     return render_template('add_department.html', departments=dept_list)
 
 # -------------------- Add Event --------------------
+def _max_numeric_event_id() -> int:
+    """Return the highest numeric event document id (0 if there are none)."""
+    max_id = 0
+    # only document names are needed here
+    for ev in db.collection('events').select(['__name__']).stream():
+        try:
+            eid = int(ev.id)
+            if eid > max_id:
+                max_id = eid
+        except Exception:
+            continue
+    return max_id
+
+
+def _create_event(data: dict) -> int:
+    """Store a new event under the next numeric id and return that id.
+
+    The last issued id lives in counters/events and is bumped in the same transaction
+    that creates the event document, so concurrent add_event requests never receive the
+    same id. The first call (when the counter document does not exist yet) seeds it from
+    the existing event ids. If an event already exists at the next id (e.g. one imported
+    outside this app) the id is skipped rather than overwritten.
+    """
+    counter_ref = db.collection('counters').document('events')
+    transaction = db.transaction()
+
+    @firestore.transactional
+    def _txn_create(tx, ref):
+        snap = ref.get(transaction=tx)
+        if snap.exists:
+            last_id = int((snap.to_dict() or {}).get('last_id', 0))
+        else:
+            last_id = _max_numeric_event_id()
+        new_id = last_id + 1
+        event_ref = db.collection('events').document(str(new_id))
+        while event_ref.get(transaction=tx).exists:
+            new_id += 1
+            event_ref = db.collection('events').document(str(new_id))
+        tx.set(ref, {'last_id': new_id})
+        # create() fails instead of overwriting if the document appeared meanwhile
+        tx.create(event_ref, dict(data, id=new_id))
+        return new_id
+
+    return _txn_create(transaction, counter_ref)
+
+
 @app.route('/add_event', methods=['GET', 'POST'])
 def add_event():
-    departments = db.collection('departments').stream()
-    dept_list = [(dept.id, dept.to_dict().get('name', '')) for dept in departments]
+    dept_list = [(did, d.get('name', '')) for did, d in _cached_depts()]
 
     default_date = '2025-10-24'
 
@@ -572,12 +830,10 @@ def add_event():
         if event_file and event_file.filename != "":
             filename = secure_filename(event_file.filename)
             path = os.path.join(app.config['UPLOAD_EVENT_FOLDER'], filename)
-            event_file.save(path)
+            _stream_save(event_file, path)
             image_url = make_static_url(f'event_images/{filename}')
 
-        # Get department QR and store event in top-level `events` collection
-        dept_doc = db.collection('departments').document(dept_id).get() if dept_id else None
-            # No payment_qr_url needed
+        # Store event in top-level `events` collection (no payment_qr_url needed)
 
         # status: use string 'open' or 'close'. Accept legacy numeric values and normalize.
         status = _normalize_status(request.form.get('status', 'open'))
@@ -592,20 +848,8 @@ def add_event():
 
         prize = request.form.get('prize', '')
 
-        # Find the highest numeric event id in the collection
-        all_events = db.collection('events').stream()
-        max_id = 0
-        for ev in all_events:
-            try:
-                eid = int(ev.id)
-                if eid > max_id:
-                    max_id = eid
-            except Exception:
-                continue
-        new_id = max_id + 1
-        event_ref = db.collection('events').document(str(new_id))
-        event_ref.set({
-            'id': new_id,
+        # Store the event under the next sequential numeric id from the counter document
+        new_id = _create_event({
             'department': dept_id,
             'name': name,
             'description': description,
@@ -622,6 +866,7 @@ def add_event():
             'status': status,
             'created_at': datetime.utcnow()
         })
+        _invalidate_events(new_id)
         return redirect(url_for('add_event'))
 
     return render_template('add_event.html', departments=dept_list, default_date=default_date)
@@ -658,6 +903,7 @@ def delete_event():
 
         # Delete the event
         event_ref.delete()
+        _invalidate_events(event_id)
         
         # Also delete any registrations for this event
         registrations = db.collection('registrations').where('event_id', '==', event_id).stream()
@@ -726,6 +972,7 @@ def toggle_event_status():
                 print('toggle_event_status: update failed:', uex)
                 return jsonify({'error': 'Failed to update event status', 'details': str(uex)}), 500
 
+        _invalidate_events(event_id)
         return jsonify({'success': True, 'status': new_status, 'is_open': new_status == 'open'})
 
     except Exception as e:
@@ -733,81 +980,50 @@ def toggle_event_status():
         return jsonify({'error': 'Failed to update event status', 'details': str(e)}), 500
 
 
-def _resolve_participant_from_registration(reg_data: dict) -> Dict:
-    """Given a registration document dict, attempt to resolve participant data.
-    Handles keys: participant_id, user_id, 'participant' inline dict, participant_email, email.
-    Returns participant dict or None if not found.
-    """
-    if not reg_data or not isinstance(reg_data, dict):
-        return None
-
-    # Inline participant object
-    inline = reg_data.get('participant')
-    if inline and isinstance(inline, dict):
-        return inline
-
-    # Common id fields
-    pid = reg_data.get('participant_id') or reg_data.get('user_id') or reg_data.get('uid')
-    if pid:
-        # Try participants collection first
-        ref = db.collection('participants').document(pid).get()
-        if ref.exists:
-            return ref.to_dict()
-        # fallback to users collection
-        ref2 = db.collection('users').document(pid).get()
-        if ref2.exists:
-            return ref2.to_dict()
-
-    # Try to resolve by email if provided in registration
-    email = reg_data.get('participant_email') or reg_data.get('email') or reg_data.get('user_email')
-    if email:
-        # search participants by email
-        q = db.collection('participants').where('email', '==', email).limit(1).stream()
-        for doc in q:
-            return doc.to_dict()
-        q2 = db.collection('users').where('email', '==', email).limit(1).stream()
-        for doc in q2:
-            return doc.to_dict()
-    return None
-
 # -------------------- View Participants --------------------
 @app.route('/view_participants', methods=['GET'])
 def view_participants():
-    departments = db.collection('departments').stream()
-    dept_list = [(dept.id, dept.to_dict()['name']) for dept in departments]
-    # build quick lookup map for department id -> name
-    dept_map = {d[0]: d[1] for d in dept_list}
-
     selected_dept_id = request.args.get('dept_id')
     # template uses 'event_id' (which contains the event name in this dataset)
     selected_event_id = request.args.get('event_id')
+
+    departments = _cached_depts()
+    dept_list = [(did, d['name']) for did, d in departments]
+    # build quick lookup map for department id -> name
+    dept_map = {d[0]: d[1] for d in dept_list}
+
+    # If a department is selected via dept_id (which is a department document id), translate to department name
+    selected_dept_name = dept_map.get(selected_dept_id) if selected_dept_id else None
+
     # If an event is selected from the dropdown, enable sorting by event
     sort_by_event = bool(selected_event_id)
     participants_info: List[Dict] = []
 
-    # events_for_select: used to populate events dropdown. Build after we know selected_dept_id
-
-    # Primary source: participants collection (no registrations in your setup)
-    parts = db.collection('participants').stream()
+    # Primary source: participants collection (no registrations in your setup).
+    # Department/event filters run in Firestore (see firestore.indexes.json) and only
+    # the displayed fields are returned.
+    q = db.collection('participants')
+    if selected_dept_name:
+        q = q.where('department', '==', selected_dept_name)
+    if selected_event_id:
+        q = q.where('event', '==', selected_event_id)
+    q = q.select(PARTICIPANT_FIELDS)
 
-    # If a department is selected via dept_id (which is a department document id), translate to department name
-    selected_dept_name = None
+    # events_for_select: used to populate events dropdown (limited to selected department if provided)
     if selected_dept_id:
-        ddoc = db.collection('departments').document(selected_dept_id).get()
-        if ddoc.exists:
-            selected_dept_name = ddoc.to_dict().get('name')
+        events_loader = lambda: _cached_events_by_dept(selected_dept_id)
+    else:
+        events_loader = lambda: [(e.id, e.to_dict() or {}) for e in db.collection('events').select(['name']).stream()]
 
-    # selected_event_id is taken directly from query string (if any)
+    # participants and events are independent reads; fetch them concurrently
+    with ThreadPoolExecutor(max_workers=2) as ex:
+        parts_f = ex.submit(lambda: list(q.stream()))
+        events_f = ex.submit(events_loader)
 
-    for pdoc in parts:
+    for pdoc in parts_f.result():
         p = pdoc.to_dict()
         p_dept = p.get('department') or ''
         p_event = p.get('event') or ''
-        # apply filters if provided
-        if selected_dept_name and p_dept != selected_dept_name:
-            continue
-        if selected_event_id and p_event != selected_event_id:
-            continue
 
         participants_info.append({
             'name': p.get('name'),
@@ -822,18 +1038,15 @@ def view_participants():
             'transaction_id': p.get('transactionId') or p.get('transaction_id')
         })
 
+    # Sort in Python rather than with order_by: Firestore ordering would also drop every
+    # participant that lacks the 'department' or 'name' field.
     # Sort: department name first, then optional event name, then participant name
     if sort_by_event:
         participants_info = sorted(participants_info, key=lambda r: (r.get('dept_name', ''), r.get('event_name', ''), r.get('name', '')))
     else:
         participants_info = sorted(participants_info, key=lambda r: (r.get('dept_name', ''), r.get('name', '')))
 
-    # Build events_for_select now (limit to selected department if provided)
-    if selected_dept_id:
-        ev_q = db.collection('events').where('department', '==', selected_dept_id).stream()
-    else:
-        ev_q = db.collection('events').stream()
-    events_for_select = [(e.to_dict().get('name'), e.to_dict().get('name')) for e in ev_q]
+    events_for_select = [(ed.get('name'), ed.get('name')) for _eid, ed in events_f.result()]
 
     return render_template('view_participants.html',
                            departments=dept_list,
@@ -861,18 +1074,17 @@ def participants_list():
     # resolve department name from dept_id if provided
     if dept_id:
         try:
-            ddoc = db.collection('departments').document(dept_id).get()
-            if ddoc.exists:
-                dept_name = ddoc.to_dict().get('name')
+            dept = _get_dept(dept_id)
+            if dept is not None:
+                dept_name = dept.get('name')
         except Exception:
             dept_name = None
 
     # Build event list for this department (by dept id OR by stored department field)
     try:
-        ev_q = db.collection('events').stream() if not dept_id else db.collection('events').stream()
         # collect events that match the department id or department field
         evs = []
-        for ed in db.collection('events').stream():
+        for ed in db.collection('events').select(['name', 'department', 'dept_id']).stream():
             ev = ed.to_dict()
             ev_dept = ev.get('department') or ev.get('dept_id') or ''
             if dept_id:
@@ -892,7 +1104,7 @@ def participants_list():
         q = db.collection('participants')
         if dept_name:
             q = q.where('department', '==', dept_name)
-        for pdoc in q.stream():
+        for pdoc in q.select(PARTICIPANT_FIELDS).stream():
             p = pdoc.to_dict()
             doc_id = getattr(pdoc, 'id', None)
             pname = p.get('name','')
@@ -951,9 +1163,9 @@ def download_participants():
         if dept_id:
             # resolve department name if possible
             try:
-                ddoc = db.collection('departments').document(dept_id).get()
-                if ddoc.exists:
-                    dept_name = ddoc.to_dict().get('name')
+                dept = _get_dept(dept_id)
+                if dept is not None:
+                    dept_name = dept.get('name')
                 else:
                     dept_name = dept_id
             except Exception:
@@ -962,7 +1174,7 @@ def download_participants():
         if event_name:
             q = q.where('event', '==', event_name)
 
-        for doc in q.stream():
+        for doc in q.select(PARTICIPANT_FIELDS).stream():
             data = doc.to_dict() or {}
             participants.append({
                 'name': data.get('name', ''),
@@ -1088,55 +1300,26 @@ def download_participants():
     return "Invalid format type", 400
 
 
-def _gather_participants(dept_id: str, event_id: str = None) -> List[Dict]:
-    """Helper to collect participants for a department, optionally filtering by event id."""
-    rows: List[Dict] = []
-    if not dept_id:
-        return rows
+EXPORT_PAGE_SIZE = 1000
 
-    # Build list of event ids for the department (or single event id if provided)
-    event_ids = []
-    event_map = {}
-    if event_id:
-        ev_doc = db.collection('events').document(event_id).get()
-        if ev_doc.exists:
-            event_ids = [ev_doc.id]
-            event_map[ev_doc.id] = ev_doc.to_dict()
-    else:
-        events = db.collection('events').where('department', '==', dept_id).stream()
-        for e in events:
-            event_ids.append(e.id)
-            event_map[e.id] = e.to_dict()
-
-    if not event_ids:
-        return rows
-
-    # Firestore 'in' queries accept up to 10 items; batch if necessary
-    BATCH = 10
-    for i in range(0, len(event_ids), BATCH):
-        batch_ids = event_ids[i:i+BATCH]
-        regs_query = db.collection('registrations').where('event_id', 'in', batch_ids).stream()
-        for reg in regs_query:
-            reg_data = reg.to_dict()
-            p = _resolve_participant_from_registration(reg_data)
-            if not p:
-                continue
-            ev_id = reg_data.get('event_id')
-            ev_data = event_map.get(ev_id, {})
-            rows.append({
-                'name': p.get('name'),
-                'email': p.get('email'),
-                'phone': p.get('phone'),
-                'college': p.get('college'),
-                'branch': _get_branch(p),
-                'year': p.get('year'),
-                'event_name': ev_data.get('name'),
-                'dept_name': ev_data.get('department') or ev_data.get('dept_id') or '',
-                'event_id': ev_id,
-                'transaction_id': reg_data.get('transaction_id')
-            })
 
-    return rows
+def _stream_paged(query, page_size: int = EXPORT_PAGE_SIZE):
+    """Return an iterator over every document of an ordered query, fetching page_size documents per request.
+
+    The first page is read before this returns, so query errors (missing index,
+    permissions) reach the caller instead of surfacing midway through a streamed response.
+    """
+    first = list(query.limit(page_size).stream())
+
+    def _pages():
+        docs = first
+        while True:
+            yield from docs
+            if len(docs) < page_size:
+                return
+            docs = list(query.limit(page_size).start_after(docs[-1]).stream())
+
+    return _pages()
 
 
 @app.route('/export_participants')
@@ -1147,32 +1330,25 @@ def export_participants():
     """
     dept_id = request.args.get('dept_id')
     event_id = request.args.get('event_id')
-    fmt = request.args.get('format', 'xlsx').lower()
-
-    # Helper to sanitize filename parts
-    def _sanitize(s: str) -> str:
-        if not s:
-            return ''
-        s = s.lower()
-        # replace non-alphanumeric with underscore
-        s = re.sub(r'[^a-z0-9]+', '_', s)
-        s = s.strip('_')
-        return s or 'value'
+    fmt = request.args.get('format', 'csv').lower()
+    # reject unknown formats before any Firestore read is made
+    if fmt not in ('csv', 'xlsx', 'pdf'):
+        return Response('Unsupported format. Allowed: csv, xlsx, pdf', status=400)
 
     # Determine dept_name (participants store department by name in this dataset)
     dept_name = None
     if dept_id:
-        d = db.collection('departments').document(dept_id).get()
-        if d.exists:
-            dept_name = d.to_dict().get('name')
+        d = _get_dept(dept_id)
+        if d is not None:
+            dept_name = d.get('name')
 
     # Determine event_name: try doc id first, else treat as event name string
     event_name = None
     if event_id:
         # try as doc id
-        evdoc = db.collection('events').document(event_id).get()
-        if evdoc.exists:
-            event_name = evdoc.to_dict().get('name')
+        evdoc = _get_event_data(event_id)
+        if evdoc is not None:
+            event_name = evdoc.get('name')
         else:
             # assume event_id is a name string
             event_name = event_id
@@ -1183,10 +1359,12 @@ def export_participants():
         q = q.where('department', '==', dept_name)
     if event_name:
         q = q.where('event', '==', event_name)
-    rows = []
-    for doc in q.stream():
-        p = doc.to_dict()
-        rows.append({
+    # Page in document-id order: every document has an id, whereas ordering on a data
+    # field would drop participants that lack it (e.g. no 'department' or 'event').
+    q = q.order_by('__name__').select(PARTICIPANT_FIELDS)
+
+    def _export_row(p: dict) -> dict:
+        return {
             'name': p.get('name', ''),
             'email': p.get('email', ''),
             'phone': p.get('phone', ''),
@@ -1196,10 +1374,13 @@ def export_participants():
             'event_name': p.get('event', ''),
             'dept_name': p.get('department', ''),
             'transaction_id': p.get('transactionId') or p.get('transaction_id', '')
-        })
+        }
 
-    # Sort
-    rows = sorted(rows, key=lambda r: (r.get('dept_name', ''), r.get('event_name', ''), r.get('name', '')))
+    # Documents are read one page at a time, then sorted by department/event/name here:
+    # ordering on those fields in Firestore would drop participants that lack them
+    docs = _stream_paged(q)
+    rows = sorted((_export_row(doc.to_dict()) for doc in docs),
+                  key=lambda r: (r.get('dept_name', ''), r.get('event_name', ''), r.get('name', '')))
 
     headers = ['name', 'email', 'phone', 'college', 'branch', 'year', 'event_name', 'dept_name', 'transaction_id']
 
@@ -1208,17 +1389,32 @@ def export_participants():
     part_event = _sanitize(event_name) if event_name else 'all_events'
     base_filename = f'tantra_{part_dept}_{part_event}'
 
+    if fmt == 'csv':
+        # Stream the CSV text row by row instead of building the whole file in memory
+        def generate():
+            buf = io.StringIO()
+            writer = csv.writer(buf)
+            writer.writerow(headers)
+            yield buf.getvalue()
+            for r in rows:
+                buf.seek(0)
+                buf.truncate()
+                writer.writerow([r.get(h, '') for h in headers])
+                yield buf.getvalue()
+
+        filename = f'{base_filename}.csv'
+        return Response(generate(), mimetype='text/csv',
+                        headers={'Content-Disposition': f'attachment; filename={filename}'})
+
     if fmt == 'xlsx':
-        try:
-            import pandas as pd
-        except Exception:
-            return Response('pandas is required to export XLSX. Install with `pip install pandas openpyxl`', status=500)
-        df = pd.DataFrame(rows)
-        for h in headers:
-            if h not in df.columns:
-                df[h] = ''
+        # write-only workbook: rows are serialized as they are appended
+        wb = openpyxl.Workbook(write_only=True)
+        ws = wb.create_sheet()
+        ws.append(headers)
+        for r in rows:
+            ws.append([r.get(h, '') for h in headers])
         buf = io.BytesIO()
-        df.to_excel(buf, index=False)
+        wb.save(buf)
         buf.seek(0)
         filename = f'{base_filename}.xlsx'
         return send_file(buf, as_attachment=True, download_name=filename, mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
@@ -1246,7 +1442,7 @@ def export_participants():
         filename = f'{base_filename}.pdf'
         return send_file(buf, as_attachment=True, download_name=filename, mimetype='application/pdf')
 
-    return Response('Unsupported format. Allowed: xlsx, pdf', status=400)
+    return Response('Unsupported format. Allowed: csv, xlsx, pdf', status=400)
 
 
 @app.route('/export_visible_pdf', methods=['POST'])
@@ -1366,19 +1562,17 @@ def export_visible_xlsx():
 # -------------------- View Database Content --------------------
 @app.route('/db_content')
 def db_content():
-    departments = db.collection('departments').stream()
     all_data = []
-    for dept in departments:
-        dept_data = dept.to_dict()
+    for dept_id, dept_data in _cached_depts():
         # load events from top-level collection that belong to this department
-        events = db.collection('events').where('dept_id', '==', dept.id).stream()
+        events = db.collection('events').where('dept_id', '==', dept_id).stream()
         event_list = []
         for e in events:
             ev = e.to_dict()
             ev['_id'] = e.id
             event_list.append(ev)
         all_data.append({
-            'dept_id': dept.id,
+            'dept_id': dept_id,
             'dept_name': dept_data.get('name'),
             'description': dept_data.get('description'),
             'logo_url': dept_data.get('logo_url'),
@@ -1390,21 +1584,24 @@ def db_content():
 
 @app.route('/fix_events', methods=['GET', 'POST'])
 def fix_events():
-    # list departments for selection
-    departments = list(db.collection('departments').stream())
-    dept_list = [(d.id, d.to_dict().get('name')) for d in departments]
-
     message = ''
     if request.method == 'POST':
         event_id = request.form.get('event_id')
         new_dept = request.form.get('dept_id')
         if event_id and new_dept:
             db.collection('events').document(event_id).update({'dept_id': new_dept})
+            _invalidate_events(event_id)
             message = 'Updated event department.'
 
-    # find events with missing/unknown dept_id
-    events = list(db.collection('events').stream())
-    dept_ids = {d.id for d in departments}
+    # list departments for selection
+    departments = _cached_depts()
+    dept_list = [(did, d.get('name')) for did, d in departments]
+
+    # find events with missing/unknown dept_id. Only the fields shown on the page are
+    # fetched; the filter itself stays client-side because Firestore's 'not-in' skips
+    # documents that have no dept_id at all and accepts at most 10 values.
+    events = db.collection('events').select(['name', 'date', 'dept_id']).stream()
+    dept_ids = {did for did, _d in departments}
     problematic = []
     for e in events:
         ed = e.to_dict()
@@ -1432,8 +1629,7 @@ def repair_events():
     apply = request.args.get('apply', '') == '1'
 
     # load departments map (id -> name)
-    departments = list(db.collection('departments').stream())
-    dept_ids = {d.id for d in departments}
+    dept_ids = {did for did, _d in _cached_depts()}
 
     events = list(db.collection('events').stream())
     report = {'total_events': len(events), 'problems': [], 'applied': []}
@@ -1480,6 +1676,7 @@ def repair_events():
             try:
                 db.collection('events').document(doc_id).update(changes)
                 report['applied'].append({'doc': doc_id, 'changes': changes})
+                _invalidate_events(doc_id)
             except Exception as ex:
                 report.setdefault('errors', []).append({'doc': doc_id, 'error': str(ex)})
 
@@ -1490,7 +1687,8 @@ if __name__ == '__main__':
     # When running locally, allow PORT to be overridden (Render provides $PORT).
     port = int(os.environ.get('PORT', 5000))
     # Bind to 0.0.0.0 so Render (or other hosts) can reach the service.
-    app.run(host='0.0.0.0', port=port, debug=True)
+    # Debug mode (reloader + debugger) only when explicitly requested with FLASK_DEBUG=1.
+    app.run(host='0.0.0.0', port=port, debug=os.environ.get('FLASK_DEBUG') == '1')
 
 
 
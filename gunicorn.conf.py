@@ -0,0 +1,31 @@
+"""Gunicorn settings used by start.py (Render).
+
+Threaded workers let one process serve several requests while others wait on
+Firestore. The app is imported once in the master (preload_app) and each worker
+then creates its own Firestore client after the fork.
+"""
+import os
+
+# A single worker by default: the department/event caches in app.py live in-process and
+# are only cleared in the worker that handled a write, so extra workers would serve stale
+# metadata. The gthread threads below already give I/O concurrency.
+workers = int(os.environ.get('WEB_CONCURRENCY', 1))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
+timeout = 60
+
+# Import app.py once in the master. Firebase is initialized lazily, so no gRPC
+# channel exists yet at fork time (gRPC channels must not be shared across fork()).
+preload_app = True
+
+
+def post_fork(server, worker):
+    # Set up this worker's Firestore client before it accepts requests, and issue one
+    # cheap read so the gRPC channel (DNS, TLS, HTTP/2) is open before the first real
+    # request instead of during it.
+    from app import _init_firebase
+    client = _init_firebase()
+    try:
+        client.collection('counters').document('ping').get()
+    except Exception as e:
+        server.log.warning('Firestore warm-up read failed: %s', e)
@@ -6,7 +6,7 @@ FIREBASE_CREDENTIALS_FILE to that path, then execs gunicorn to run the app.
 """
 import os
 import sys
-import json
+import orjson
 import tempfile
 
 
@@ -16,8 +16,8 @@ def write_service_account(json_str: str):
     # If json_str came via env var it may contain literal \n sequences or be compact
     try:
         # Try to parse then pretty-write to ensure valid JSON
-        obj = json.loads(json_str)
-        tf.write(json.dumps(obj, indent=2).encode('utf-8'))
+        obj = orjson.loads(json_str)
+        tf.write(orjson.dumps(obj, option=orjson.OPT_INDENT_2))
     except Exception:
         # Fallback: write raw string
         tf.write(json_str.encode('utf-8'))
@@ -34,9 +34,10 @@ def main():
         # Expose the file path to the app
         os.environ['FIREBASE_CREDENTIALS_FILE'] = path
 
-    # Default to running gunicorn for the app callable
+    # Default to running gunicorn for the app callable; worker settings live in gunicorn.conf.py
     bind = f'0.0.0.0:{port}'
-    cmd = ['gunicorn', 'app:app', '--bind', bind]
+    conf = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'gunicorn.conf.py')
+    cmd = ['gunicorn', '-c', conf, 'app:app', '--bind', bind]
 
     # Replace current process with gunicorn
     os.execvp(cmd[0], cmd)